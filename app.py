@@ -1,8 +1,15 @@
 # app.py
+import glob
+import hashlib
+import os
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 import plotly.express as px
-from prophet import Prophet
 import plotly.graph_objects as go
 
 # ------------------------------
@@ -74,16 +81,76 @@ style_dashboard()
 # ------------------------------
 # Caching Functions for Performance
 # ------------------------------
-@st.cache_data
+def _file_signature(path):
+    """
+    Cache key for a data file: its path, modification time and size.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, stat.st_mtime, stat.st_size)
+
+CSV_BLOCK_SIZE = 16 << 20  # bytes of CSV parsed per streamed batch
+# Explicit types so every streamed block parses the same way; YEAR is never read.
+# DATE stays text and is parsed (with coercion) in pandas.
+CSV_COLUMN_TYPES = {
+    'DATE': pa.string(),
+    'T2M': pa.float64(),
+    'T2M_MAX': pa.float64(),
+    'T2M_MIN': pa.float64(),
+    'PRECTOTCORR': pa.float64(),
+    'AQI': pa.float64(),
+    'City': pa.string()
+}
+
+@st.cache_data(hash_funcs={str: _file_signature})
 def load_data(file_path):
     """
     Load, clean, and preprocess data.
+    A Parquet snapshot of the CSV is kept next to it to speed up later starts.
     """
+    parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+    table = None
     try:
-        data = pd.read_csv(file_path)
-    except FileNotFoundError:
-        st.error(f"Error: The file '{file_path}' was not found. Please ensure it is in the correct directory.")
-        return pd.DataFrame()
+        if os.path.getmtime(parquet_path) >= os.path.getmtime(file_path):
+            table = pq.read_table(parquet_path)
+    except (OSError, pa.ArrowException):
+        # Missing, stale or unreadable snapshot: rebuild it from the CSV.
+        table = None
+
+    if table is None:
+        try:
+            reader = pv.open_csv(
+                file_path,
+                read_options=pv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                convert_options=pv.ConvertOptions(
+                    column_types=CSV_COLUMN_TYPES,
+                    include_columns=list(CSV_COLUMN_TYPES),
+                    strings_can_be_null=True
+                )
+            )
+            # Stream the CSV block by block, dropping undated rows before they accumulate.
+            batches = [b.filter(pc.is_valid(b.column('DATE'))) for b in reader]
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+        except FileNotFoundError:
+            st.error(f"Error: The file '{file_path}' was not found. Please ensure it is in the correct directory.")
+            return pd.DataFrame()
+        except pa.ArrowInvalid as e:
+            st.error(f"Error: Could not read '{file_path}': {e}")
+            return pd.DataFrame()
+        # Write to a temp file and swap it in so readers never see a partial snapshot.
+        tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, parquet_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    data = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
 
     rename_dict = {
         'DATE': 'Date',
@@ -111,41 +178,202 @@ def load_data(file_path):
         'Tirupati': (13.6288, 79.4192), 'Vijayawada': (16.5062, 80.6480),
         'Visakhapatnam': (17.6868, 83.2185)
     }
-    data['lat'] = data['City'].map(lambda x: coords.get(x, (None, None))[0])
-    data['lon'] = data['City'].map(lambda x: coords.get(x, (None, None))[1])
+    lat_map = {c: v[0] for c, v in coords.items()}
+    lon_map = {c: v[1] for c, v in coords.items()}
+    data['lat'] = data['City'].map(lat_map)
+    data['lon'] = data['City'].map(lon_map)
+
+    for col in ['Avg_Temperature', 'Max_Temperature', 'Min_Temperature', 'Rainfall(mm)', 'AQI']:
+        if col in data.columns:
+            data[col] = pd.to_numeric(data[col], downcast='float')
+
+    data['City'] = data['City'].astype('category')
+    data = data.sort_values(['City', 'Date']).set_index('City')
 
     return data
 
-@st.cache_data
-def forecast_city(_data, city, column, days=7):
+FORECAST_COLUMNS = ['Avg_Temperature', 'Rainfall(mm)']
+MODEL_CACHE_DIR = "cache"
+
+def _load_or_fit_model(df, city, column, refit=False):
     """
-    Forecast future values for a given column & city using Prophet.
+    Load a fitted AutoARIMA model from the disk cache, fitting and saving it on a miss.
+    Cache files are keyed on a hash of the series and the statsforecast version, so new
+    data or an upgrade triggers a refit. Returns (model, loaded_from_cache).
     """
-    city_data = _data[_data['City'] == city]
-    df = city_data[['Date', column]].rename(columns={'Date':'ds', column:'y'})
-    df['ds'] = pd.to_datetime(df['ds'])
-
-    model = Prophet()
+    # Imported lazily so the forecasting stack is only loaded once a forecast is requested.
+    import joblib
+    import statsforecast
+    from statsforecast import StatsForecast
+    from statsforecast.models import AutoARIMA
+
+    digest = hashlib.md5()
+    digest.update(statsforecast.__version__.encode())
+    digest.update(df['ds'].to_numpy().tobytes())
+    digest.update(df['y'].to_numpy().tobytes())
+    prefix = os.path.join(MODEL_CACHE_DIR, f"{city}_{column}_")
+    model_path = f"{prefix}{digest.hexdigest()[:8]}.pkl"
+
+    if not refit:
+        try:
+            model = joblib.load(model_path)
+        except Exception:
+            # Missing, truncated or written by another library version: refit below.
+            model = None
+        if isinstance(model, StatsForecast):
+            return model, True
+
+    model = StatsForecast(models=[AutoARIMA()], freq='D')
     model.fit(df)
 
-    future = model.make_future_dataframe(periods=days)
-    forecast = model.predict(future)
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+        joblib.dump(model, tmp_path, compress=3)
+        os.replace(tmp_path, model_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return model, False
+
+    # Drop models fitted on earlier versions of this series.
+    for stale_path in glob.glob(f"{glob.escape(prefix)}*.pkl"):
+        if stale_path != model_path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return model, False
+
+def _fit_and_predict(df, city, column, days=7):
+    """
+    Forecast the next days of one city's series with its (cached) AutoARIMA model.
+    """
+    model, loaded = _load_or_fit_model(df, city, column)
 
-    last_date = df['ds'].max()
-    forecast_future = forecast[forecast['ds'] > last_date].copy()
+    try:
+        forecast = model.predict(h=days, level=[95])
+    except Exception:
+        if not loaded:
+            raise
+        # The cached model loaded but cannot predict: replace it with a fresh fit.
+        model, _ = _load_or_fit_model(df, city, column, refit=True)
+        forecast = model.predict(h=days, level=[95])
+    yhat = forecast['AutoARIMA'].to_numpy(dtype=np.float64, copy=True)
+    yhat_lower = forecast['AutoARIMA-lo-95'].to_numpy(dtype=np.float64, copy=True)
+    yhat_upper = forecast['AutoARIMA-hi-95'].to_numpy(dtype=np.float64, copy=True)
 
     if column == "Rainfall(mm)":
-        forecast_future['yhat'] = forecast_future['yhat'].clip(lower=0)
-        forecast_future['yhat_lower'] = forecast_future['yhat_lower'].clip(lower=0)
-        forecast_future['yhat_upper'] = forecast_future['yhat_upper'].clip(lower=0)
+        np.maximum(yhat, 0.0, out=yhat)
+        np.maximum(yhat_lower, 0.0, out=yhat_lower)
+        np.maximum(yhat_upper, 0.0, out=yhat_upper)
+
+    return pd.DataFrame({
+        'ds': forecast['ds'].to_numpy(),
+        'yhat': yhat,
+        'yhat_lower': yhat_lower,
+        'yhat_upper': yhat_upper
+    })
+
+def _try_fit_and_predict(df, city, column, days=7):
+    """
+    Run _fit_and_predict, returning None if the series cannot be fitted.
+    """
+    try:
+        return _fit_and_predict(df, city, column, days)
+    except Exception:
+        return None
 
-    return forecast_future
+@st.cache_resource
+def build_city_series(_data, data_key):
+    """
+    Split each city's dates & forecast columns into NumPy arrays keyed by (city, column).
+    """
+    return {
+        (city, column): (group['Date'].to_numpy(), group[column].to_numpy(dtype=np.float64))
+        for city, group in _data.groupby('City', observed=True)
+        for column in FORECAST_COLUMNS
+    }
+
+@st.cache_resource
+def precompute_all_forecasts(_data, data_key, days=7):
+    """
+    Fit every city & column in parallel once and return {(city, column): forecast}.
+    A series that fails to fit maps to None instead of aborting the others.
+    """
+    from joblib import Parallel, delayed
+
+    city_series = build_city_series(_data, data_key)
+
+    results = Parallel(n_jobs=-1, backend='loky')(
+        delayed(_try_fit_and_predict)(pd.DataFrame({'unique_id': city, 'ds': ds, 'y': y}), city, column, days)
+        for (city, column), (ds, y) in city_series.items()
+    )
+    return dict(zip(city_series, results))
+
+def forecast_city(data, data_key, city, column, days=7):
+    """
+    Look up the precomputed forecast for a given column & city (None if it failed).
+    `data_key` identifies the loaded data, e.g. the data file's signature.
+    """
+    return precompute_all_forecasts(data, data_key, days)[(city, column)]
+
+@st.cache_data
+def build_map_data(_data, data_key):
+    """
+    Aggregate the mean temperature and coordinates of each city for the map.
+    """
+    return _data.groupby('City', observed=True).agg({
+        'Avg_Temperature': 'mean',
+        'lat': 'first',
+        'lon': 'first'
+    }).reset_index()
+
+def thin_series(df, column=None, how='mean', max_points=2000):
+    """
+    Resample a long time series to weekly buckets before handing it to Plotly.
+    Accepts a frame with a Date column, or a Date-indexed frame with one column per city.
+    """
+    if 'Date' not in df.columns:
+        return df if len(df) < max_points else df.resample('W').agg(how)
+    if len(df) < max_points:
+        return df
+    return df.set_index('Date')[column].resample('W').agg(how).reset_index()
+
+def city_lines_figure(df, column):
+    """
+    Build a WebGL line chart with one trace per city from a Date-indexed frame.
+    """
+    fig = go.Figure()
+    dates = df.index.to_numpy()
+    for city_name in df.columns:
+        fig.add_trace(go.Scattergl(
+            x=dates, y=df[city_name].to_numpy(), mode='lines', name=city_name, connectgaps=True
+        ))
+    fig.update_layout(xaxis_title='Date', yaxis_title=column, legend_title_text='City')
+    return fig
+
+@st.cache_data
+def daily_pivot(_data, data_key):
+    """
+    Pivot the daily metrics to a Date-indexed table with (metric, city) columns.
+    """
+    return _data.pivot_table(
+        index='Date',
+        columns='City',
+        values=['Avg_Temperature', 'Rainfall(mm)', 'AQI'],
+        aggfunc='mean',
+        observed=True
+    ).sort_index()
 
 # ------------------------------
 # Load Data
 # ------------------------------
 DATA_FILE = "all_cities_combined_AQI.csv"
 data = load_data(DATA_FILE)
+data_key = _file_signature(DATA_FILE)
 
 if data.empty:
     st.stop()
@@ -155,7 +383,7 @@ if data.empty:
 # ------------------------------
 st.sidebar.title("⚙️ Dashboard Controls")
 
-city = st.sidebar.selectbox("Select a City for Detailed View", sorted(data['City'].unique()))
+city = st.sidebar.selectbox("Select a City for Detailed View", list(data.index.categories))
 
 min_date = data['Date'].min().date()
 max_date = data['Date'].max().date()
@@ -174,11 +402,13 @@ if len(date_range) != 2:
     st.stop()
 
 start_date, end_date = date_range
+start_ts = pd.Timestamp(start_date)
+end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
 
 st.sidebar.markdown("---")
 compare_cities = st.sidebar.multiselect(
     "Select Cities to Compare",
-    sorted(data['City'].unique()),
+    list(data.index.categories),
     default=['Vijayawada', 'Visakhapatnam', 'Tirupati']
 )
 
@@ -188,38 +418,41 @@ compare_cities = st.sidebar.multiselect(
 st.title(f"🌦️ Weather & AQI Dashboard: {city}")
 st.markdown(f"Displaying data from **{start_date.strftime('%d-%m-%Y')}** to **{end_date.strftime('%d-%m-%Y')}**.")
 
-city_data = data[
-    (data['City'] == city) &
-    (data['Date'].dt.date >= start_date) &
-    (data['Date'].dt.date <= end_date)
+city_data = data.loc[[city]]
+city_data = city_data[
+    (city_data['Date'] >= start_ts) &
+    (city_data['Date'] < end_ts)
 ]
 
 # ------------------------------
 # KPIs
 # ------------------------------
 st.subheader("📊 Key Metrics Overview")
+kpi_values = city_data[['Avg_Temperature', 'Rainfall(mm)', 'AQI']].to_numpy(dtype=np.float64)
+kpi_means = np.nanmean(kpi_values, axis=0) if len(kpi_values) else np.full(3, np.nan)
+kpi_total_rain = np.nansum(kpi_values[:, 1])
 c1, c2, c3 = st.columns(3)
 with c1:
-    c1.metric("🌡️ Avg Temp (°C)", f"{city_data['Avg_Temperature'].mean():.2f}")
+    c1.metric("🌡️ Avg Temp (°C)", f"{kpi_means[0]:.2f}")
 with c2:
-    c2.metric("☔ Total Rainfall (mm)", f"{city_data['Rainfall(mm)'].sum():.2f}")
+    c2.metric("☔ Total Rainfall (mm)", f"{kpi_total_rain:.2f}")
 with c3:
-    c3.metric("💨 Mean AQI", f"{city_data['AQI'].mean():.2f}")
+    c3.metric("💨 Mean AQI", f"{kpi_means[2]:.2f}")
 
 # ------------------------------
 # Tabs for Organization
 # ------------------------------
 tab1, tab2, tab3 = st.tabs(["📊 Historical Analysis & Map", "🔮 7-Day Forecast", "🆚 City Comparison"])
 
-with tab1:
+@st.fragment
+def render_history_tab(city, data, data_key, city_data):
+    """
+    Render the historical map and time series chart for a city.
+    """
     st.header(f"Historical Data for {city}")
 
     st.subheader("🗺️ Geographical Overview of Average Temperatures")
-    map_data = data.groupby('City').agg({
-        'Avg_Temperature': 'mean',
-        'lat': 'first',
-        'lon': 'first'
-    }).reset_index()
+    map_data = build_map_data(data, data_key)
     st.map(map_data, latitude='lat', longitude='lon', size='Avg_Temperature', color='#FF4B4B')
     st.info("Map markers are sized based on the average temperature over the entire period.")
 
@@ -230,11 +463,17 @@ with tab1:
     )
 
     if metric_to_plot == "Rainfall(mm)":
-        fig = px.bar(city_data, x='Date', y=metric_to_plot, title=f"Historical {metric_to_plot} in {city}")
+        plot_df = thin_series(city_data, metric_to_plot, how='sum')
+        trace = go.Bar(x=plot_df['Date'].to_numpy(), y=plot_df[metric_to_plot].to_numpy())
     else:
-        fig = px.line(city_data, x='Date', y=metric_to_plot, title=f"Historical {metric_to_plot} in {city}", markers=True)
+        plot_df = thin_series(city_data, metric_to_plot)
+        trace = go.Scattergl(x=plot_df['Date'].to_numpy(), y=plot_df[metric_to_plot].to_numpy(), mode='lines+markers')
+    fig = go.Figure(data=[trace])
 
     fig.update_layout(
+        title=f"Historical {metric_to_plot} in {city}",
+        xaxis_title='Date',
+        yaxis_title=metric_to_plot,
         title_x=0.5, 
         paper_bgcolor='rgba(0,0,0,0)', 
         plot_bgcolor='rgba(255,255,255,0.3)',
@@ -245,12 +484,31 @@ with tab1:
     )
     st.plotly_chart(fig, use_container_width=True)
 
-with tab2:
+with tab1:
+    render_history_tab(city, data, data_key, city_data)
+
+@st.fragment
+def render_forecast_tab(city, max_date, data, data_key):
+    """
+    Render the 7-day forecast, charts and insights for a city.
+    """
     st.header(f"7-Day Forecast for {city}")
     st.markdown(f"Predictions for the week following **{max_date.strftime('%d-%m-%Y')}**.")
 
-    forecast_temp = forecast_city(data, city, "Avg_Temperature", days=7)
-    forecast_rain = forecast_city(data, city, "Rainfall(mm)", days=7)
+    # st.tabs runs every tab body, so forecasting waits for an explicit request.
+    if not st.session_state.get('forecast_requested'):
+        if st.button("🔮 Generate 7-Day Forecast"):
+            st.session_state['forecast_requested'] = True
+        else:
+            st.info("Forecasts are computed on demand. Click the button above to generate them.")
+            return
+
+    forecast_temp = forecast_city(data, data_key, city, "Avg_Temperature", days=7)
+    forecast_rain = forecast_city(data, data_key, city, "Rainfall(mm)", days=7)
+
+    if forecast_temp is None or forecast_rain is None:
+        st.warning(f"A forecast could not be computed for {city} from the available data.")
+        return
 
     avg_pred_temp = forecast_temp['yhat'].mean()
     total_pred_rain = forecast_rain['yhat'].sum()
@@ -343,23 +601,27 @@ with tab2:
 
     st.markdown(rain_insight)
 
+with tab2:
+    render_forecast_tab(city, max_date, data, data_key)
 
-with tab3:
+@st.fragment
+def render_comparison_tab(compare_cities, data, data_key, start_ts, end_ts):
+    """
+    Render the multi-city comparison charts for the selected date range.
+    """
     st.header("City Comparison")
 
     if not compare_cities:
         st.warning("Please select at least one city from the sidebar to compare.")
     else:
-        comparison_data = data[
-            (data['City'].isin(compare_cities)) &
-            (data['Date'].dt.date >= start_date) &
-            (data['Date'].dt.date <= end_date)
-        ]
+        pivot = daily_pivot(data, data_key)
+        lo, hi = pivot.index.searchsorted([start_ts, end_ts])
+        comparison_data = pivot.iloc[lo:hi]
 
         st.subheader("🌡️ Average Temperature Comparison")
-        fig_comp_temp = px.line(comparison_data, x='Date', y='Avg_Temperature', color='City',
-                                title='Temperature Trends Across Cities')
+        fig_comp_temp = city_lines_figure(thin_series(comparison_data['Avg_Temperature'][compare_cities]), 'Avg_Temperature')
         fig_comp_temp.update_layout(
+            title='Temperature Trends Across Cities',
             paper_bgcolor='rgba(0,0,0,0)', 
             plot_bgcolor='rgba(255,255,255,0.3)',
             title_font_color="darkblue",
@@ -370,7 +632,7 @@ with tab3:
         st.plotly_chart(fig_comp_temp, use_container_width=True)
 
         st.subheader("☔ Total Rainfall Comparison")
-        total_rain = comparison_data.groupby('City')['Rainfall(mm)'].sum().reset_index()
+        total_rain = comparison_data['Rainfall(mm)'][compare_cities].sum().rename_axis('City').reset_index(name='Rainfall(mm)')
         fig_comp_rain = px.bar(total_rain, x='City', y='Rainfall(mm)', color='City',
                                title='Total Rainfall Across Cities (for selected date range)')
         fig_comp_rain.update_layout(
@@ -384,9 +646,9 @@ with tab3:
         st.plotly_chart(fig_comp_rain, use_container_width=True)
         
         st.subheader("💨 AQI Trend Comparison")
-        fig_comp_aqi = px.line(comparison_data, x='Date', y='AQI', color='City',
-                               title='AQI Trends Across Cities')
+        fig_comp_aqi = city_lines_figure(thin_series(comparison_data['AQI'][compare_cities]), 'AQI')
         fig_comp_aqi.update_layout(
+            title='AQI Trends Across Cities',
             paper_bgcolor='rgba(0,0,0,0)', 
             plot_bgcolor='rgba(255,255,255,0.3)',
             title_font_color="darkblue",
@@ -395,3 +657,6 @@ with tab3:
             legend=dict(font_color="darkblue")
         )
         st.plotly_chart(fig_comp_aqi, use_container_width=True)
+
+with tab3:
+    render_comparison_tab(compare_cities, data, data_key, start_ts, end_ts)
@@ -1,8 +1,9 @@
 # forecast_test.py
-# Self-contained script to test Prophet forecast for Weather Data
+# Self-contained script to test the AutoARIMA forecast for Weather Data
 
 import pandas as pd
-from prophet import Prophet
+from statsforecast import StatsForecast
+from statsforecast.models import AutoARIMA
 
 # -----------------------------
 # Step 1: Forecast Function
@@ -16,7 +17,7 @@ def forecast_city(data, city, column, days=7):
         column : Column to forecast (string)
         days   : Number of days to predict ahead
     Returns:
-        forecast : DataFrame containing historical + predicted values
+        forecast : DataFrame containing the predicted values (ds, yhat)
     """
     # Filter city data
     city_data = data[data['City'] == city]
@@ -24,18 +25,16 @@ def forecast_city(data, city, column, days=7):
     # Select only Date & chosen column
     df = city_data[['Date', column]].rename(columns={'Date':'ds', column:'y'})
     df['ds'] = pd.to_datetime(df['ds'])   # Ensure correct datetime format
+    df.insert(0, 'unique_id', city)
 
     # Build the model
-    model = Prophet()
+    model = StatsForecast(models=[AutoARIMA()], freq='D')
     model.fit(df)
 
-    # Create future dates
-    future = model.make_future_dataframe(periods=days)
-
     # Predict
-    forecast = model.predict(future)
+    forecast = model.predict(h=days)
 
-    return forecast
+    return forecast.rename(columns={'AutoARIMA': 'yhat'})
 
 
 # -----------------------------